@@ -9,59 +9,81 @@ Usage:
     python examples/01_list_datasets.py
 """
 
-import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-ROOT_URL = "https://api.beta.ons.gov.uk/v1/"
+from ons_client import MAX_WORKERS, ROOT_URL, SESSION, parse_json
+
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "output"
 
 
+def fetch_page(offset, limit):
+    """Fetch one page of the dataset catalogue. Returns the parsed JSON."""
+    response = SESSION.get(
+        ROOT_URL + "datasets",
+        params={"offset": offset, "limit": limit},
+    )
+    response.raise_for_status()
+    return parse_json(response)
+
+
 def get_all_datasets():
     """
     Fetch metadata for every dataset on the ONS API.
 
-    The API returns results in pages, so we loop through pages
-    until we've collected them all.
+    The API returns results in pages. The first page tells us how many
+    datasets there are in total, so we can then request all the
+    remaining pages at the same time instead of one after another.
     """
-    datasets = []
-    offset = 0
     limit = 50  # max items per page
 
     print("Fetching dataset catalogue from the ONS API...\n")
 
-    while True:
-        response = requests.get(
-            ROOT_URL + "datasets",
-            params={"offset": offset, "limit": limit},
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        items = data.get("items", [])
-
-        if not items:
-            break  # no more pages
-
-        datasets.extend(items)
-        offset += len(items)
+    first_page = fetch_page(0, limit)
+    datasets = list(first_page.get("items", []))
+    total_count = first_page.get("total_count")
+
+    # The server may send back fewer items per page than we asked for,
+    # so step through the catalogue by the size of page it actually
+    # returned, not by our limit.
+    page_size = len(datasets)
+
+    if total_count is None:
+        # No total to go on: page one at a time. A page smaller than the
+        # first one is the last, so we stop there rather than spending a
+        # request on an empty page.
+        page = first_page
+        while page_size and len(page.get("items", [])) == page_size:
+            page = fetch_page(len(datasets), limit)
+            datasets.extend(page.get("items", []))
+
+    elif page_size and total_count > page_size:
+        # Fetch exactly the pages that are left, in parallel.
+        # executor.map returns pages in offset order.
+        offsets = range(page_size, total_count, page_size)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for page in executor.map(lambda offset: fetch_page(offset, limit), offsets):
+                datasets.extend(page.get("items", []))
 
     print(f"Found {len(datasets)} datasets.\n")
+    if total_count is not None and len(datasets) != total_count:
+        print(f"WARNING: the API reported {total_count} datasets, "
+              f"but {len(datasets)} were returned.\n")
     return datasets
 
 
 def summarise(datasets):
     """Turn the raw JSON into a clean table."""
-    rows = []
-    for ds in datasets:
-        rows.append({
-            "id": ds.get("id", ""),
-            "title": ds.get("title", ""),
-            "description": ds.get("description", "")[:200],
-            "publisher": ds.get("publisher", {}).get("name", ""),
-            "keywords": ", ".join(ds.get("keywords", [])),
-        })
-    return pd.DataFrame(rows)
+    # Build each column as a list, then make the DataFrame in one go.
+    # This is quicker than building a dict for every row.
+    return pd.DataFrame({
+        "id": [ds.get("id", "") for ds in datasets],
+        "title": [ds.get("title", "") for ds in datasets],
+        "description": [(ds.get("description") or "")[:200] for ds in datasets],
+        "publisher": [(ds.get("publisher") or {}).get("name", "") for ds in datasets],
+        "keywords": [", ".join(ds.get("keywords") or []) for ds in datasets],
+    })
 
 
 def main():
@@ -73,8 +95,8 @@ def main():
     # Print to console
     print(f"{'ID':<45} Title")
     print("-" * 100)
-    for _, row in df.iterrows():
-        print(f"{row['id']:<45} {row['title']}")
+    for dataset_id, title in zip(df["id"].to_numpy(), df["title"].to_numpy()):
+        print(f"{dataset_id:<45} {title}")
 
     # Save to CSV
     output_path = OUTPUT_DIR / "dataset_catalogue.csv"
@@ -11,9 +11,9 @@ Usage:
 Change DATASET_ID below to explore a different dataset.
 """
 
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
-ROOT_URL = "https://api.beta.ons.gov.uk/v1/"
+from ons_client import MAX_WORKERS, ROOT_URL, SESSION, parse_json
 
 # Change this to explore a different dataset.
 # Some interesting options:
@@ -24,6 +24,11 @@ ROOT_URL = "https://api.beta.ons.gov.uk/v1/"
 #   "retail-sales-index"         - Retail sales
 DATASET_ID = "trade"
 
+# How many options to show (and fetch) per dimension. The API tells us
+# the total number of options separately, so there's no need to download
+# them all just to print a preview.
+PREVIEW_LIMIT = 10
+
 
 def get_latest_version_url(dataset_id):
     """
@@ -34,18 +39,18 @@ def get_latest_version_url(dataset_id):
     to find the latest version regardless.
     """
     print(f"Looking up dataset: {dataset_id}")
-    response = requests.get(ROOT_URL + f"datasets/{dataset_id}")
+    response = SESSION.get(ROOT_URL + f"datasets/{dataset_id}")
     response.raise_for_status()
-    data = response.json()
+    data = parse_json(response)
 
     print(f"  Title: {data.get('title', '?')}")
 
     # Check what editions exist
     editions_url = data.get("links", {}).get("editions", {}).get("href")
     if editions_url:
-        ed_response = requests.get(editions_url)
+        ed_response = SESSION.get(editions_url)
         ed_response.raise_for_status()
-        editions = ed_response.json().get("items", [])
+        editions = parse_json(ed_response).get("items", [])
 
         print(f"  Available editions: {[e.get('edition') for e in editions]}")
 
@@ -62,49 +67,68 @@ def get_latest_version_url(dataset_id):
     return data.get("links", {}).get("latest_version", {}).get("href")
 
 
+def fetch_options(version_url, dim_id, limit=PREVIEW_LIMIT):
+    """Fetch the first `limit` options for one dimension. Returns the parsed JSON."""
+    response = SESSION.get(
+        f"{version_url}/dimensions/{dim_id}/options",
+        params={"limit": limit},
+    )
+    response.raise_for_status()
+    return parse_json(response)
+
+
 def explore_dimensions(version_url):
     """
-    List all dimensions and their valid values for a dataset version.
+    List all dimensions and a preview of their valid values.
 
     This is the key step before downloading data — you need to know
     what values to pass for each dimension.
+
+    Returns a dict mapping each dimension name to its total number of
+    options and a preview of the first PREVIEW_LIMIT of them.
     """
     print(f"\nVersion URL: {version_url}\n")
 
-    response = requests.get(version_url + "/dimensions")
+    response = SESSION.get(version_url + "/dimensions")
     response.raise_for_status()
-    dimensions = response.json().get("items", [])
-
-    all_dimensions = {}
+    dimensions = parse_json(response).get("items", [])
 
+    dim_ids = []
     for dim in dimensions:
         name = dim.get("name", "")
         label = dim.get("label", name)
         dim_id = dim.get("links", {}).get("options", {}).get("id", name)
+        dim_ids.append((name, label, dim_id))
 
-        # Fetch all valid options for this dimension
-        opts_response = requests.get(
-            f"{version_url}/dimensions/{dim_id}/options",
-            params={"limit": 200},
-        )
-        opts_response.raise_for_status()
-        opts_data = opts_response.json()
+    # Fetch the options for every dimension at the same time. The
+    # requests don't depend on each other, so there's no need to wait
+    # for one to finish before starting the next. executor.map returns
+    # results in the same order as dim_ids.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(
+            lambda d: fetch_options(version_url, d[2]), dim_ids
+        ))
 
+    all_dimensions = {}
+
+    for (name, label, dim_id), opts_data in zip(dim_ids, results):
         options = {}
         for item in opts_data.get("items", []):
             options[item.get("option")] = item.get("label", "")
 
         total = opts_data.get("total_count", len(options))
-        all_dimensions[name] = options
+
+        # Only the first few options were fetched, so keep the real total
+        # alongside them. The first option is all the template below needs.
+        all_dimensions[name] = {"total_count": total, "preview": options}
 
         # Print a summary
         print(f"Dimension: {name} ({label})")
         print(f"  {total} valid option(s):")
-        for i, (opt_id, opt_label) in enumerate(options.items()):
-            if i >= 10:
-                print(f"  ... and {total - 10} more")
-                break
+        for opt_id, opt_label in options.items():
             print(f"    {opt_id}: {opt_label}")
+        if total > len(options):
+            print(f"  ... and {total - len(options)} more")
         print()
 
     return all_dimensions
@@ -122,12 +146,11 @@ def main():
     print("=" * 60)
     print("Template query parameters (using first option for each):\n")
     print("params = {")
-    for name, options in dimensions.items():
+    for name, dim in dimensions.items():
         if name.lower() == "time":
             print(f'    "{name}": "*",  # wildcard = full time series')
-        elif options:
-            first_key = next(iter(options))
-            first_label = options[first_key]
+        elif dim["preview"]:
+            first_key, first_label = next(iter(dim["preview"].items()))
             print(f'    "{name}": "{first_key}",  # {first_label}')
     print("}")
 
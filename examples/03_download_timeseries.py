@@ -14,11 +14,16 @@ Usage:
 Change DATASET_ID and DIMENSIONS below to fetch different data.
 """
 
-import requests
 import pandas as pd
 from pathlib import Path
 
-ROOT_URL = "https://api.beta.ons.gov.uk/v1/"
+from ons_client import ROOT_URL, SESSION, parse_json, sort_by_period
+
+try:
+    import ijson
+except ImportError:  # optional: pip install ijson
+    ijson = None
+
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "output"
 
 # --- Configuration ---
@@ -50,9 +55,9 @@ def get_edition_url(dataset_id, preferred_edition="time-series"):
     directly from a dataset ID. You need to find the specific
     edition -> version URL first.
     """
-    response = requests.get(ROOT_URL + f"datasets/{dataset_id}")
+    response = SESSION.get(ROOT_URL + f"datasets/{dataset_id}")
     response.raise_for_status()
-    data = response.json()
+    data = parse_json(response)
 
     fallback_url = data.get("links", {}).get("latest_version", {}).get("href")
 
@@ -60,10 +65,10 @@ def get_edition_url(dataset_id, preferred_edition="time-series"):
     if not editions_url:
         return fallback_url
 
-    ed_response = requests.get(editions_url)
+    ed_response = SESSION.get(editions_url)
     ed_response.raise_for_status()
 
-    for item in ed_response.json().get("items", []):
+    for item in parse_json(ed_response).get("items", []):
         if item.get("edition") == preferred_edition:
             return item["links"]["latest_version"]["href"]
 
@@ -78,47 +83,38 @@ def download_observations(edition_url, dimensions):
       - A time period (id and human-readable label)
       - A numeric value
     """
-    response = requests.get(edition_url + "/observations", params=dimensions)
-    response.raise_for_status()
-    data = response.json()
-
-    rows = []
-    for obs in data.get("observations", []):
-        # The time dimension can be capitalised differently across datasets
-        time_dim = (
-            obs.get("dimensions", {}).get("Time")
-            or obs.get("dimensions", {}).get("time")
-        )
-        if not time_dim:
-            continue
-
-        rows.append({
-            "period": time_dim.get("id", ""),
-            "period_label": time_dim.get("label", ""),
-            "value": obs.get("observation"),
-        })
-
-    df = pd.DataFrame(rows)
+    # stream=True lets us start reading observations before the whole
+    # response has arrived. With ijson installed we parse them one at a
+    # time, so a large response never has to sit in memory all at once.
+    with SESSION.get(edition_url + "/observations", params=dimensions, stream=True) as response:
+        response.raise_for_status()
+
+        if ijson is not None:
+            response.raw.decode_content = True  # let urllib3 undo gzip
+            observations = ijson.items(response.raw, "observations.item")
+        else:
+            observations = parse_json(response).get("observations", [])
+
+        # Collect each column in its own list, then build the DataFrame once
+        periods, period_labels, values = [], [], []
+        for obs in observations:
+            # The time dimension can be capitalised differently across datasets
+            obs_dims = obs.get("dimensions") or {}
+            time_dim = obs_dims.get("Time") or obs_dims.get("time")
+            if not time_dim:
+                continue
+
+            periods.append(time_dim.get("id", ""))
+            period_labels.append(time_dim.get("label", ""))
+            values.append(obs.get("observation"))
+
+    df = pd.DataFrame({"period": periods, "period_label": period_labels, "value": values})
 
     if not df.empty:
         df["value"] = pd.to_numeric(df["value"], errors="coerce")
 
-        # Sort chronologically. ONS uses formats like "Nov-25" (Mon-YY)
-        # which need careful parsing to avoid 1925 vs 2025 confusion.
-        try:
-            parsed = pd.to_datetime(df["period_label"], format="%b-%y")
-            df = df.assign(_sort=parsed).sort_values("_sort").drop(columns="_sort")
-        except Exception:
-            try:
-                parsed = pd.to_datetime(df["period_label"], format="mixed", dayfirst=False, errors="coerce")
-                if parsed.notna().any():
-                    df = df.assign(_sort=parsed).sort_values("_sort").drop(columns="_sort")
-                else:
-                    df = df.sort_values("period")
-            except Exception:
-                df = df.sort_values("period")
-
-        df = df.reset_index(drop=True)
+        # Sort chronologically (see sort_by_period in ons_client.py)
+        df = sort_by_period(df)
 
     return df
 
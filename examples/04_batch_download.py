@@ -10,48 +10,79 @@ Usage:
     python examples/04_batch_download.py
 """
 
-import requests
+import hashlib
+import json
+import shutil
 import time
 import re
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-ROOT_URL = "https://api.beta.ons.gov.uk/v1/"
+from ons_client import MAX_WORKERS, ROOT_URL, SESSION, parse_json, sort_by_period
+
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "output"
 
+# Resolved edition URLs are remembered between runs in this file, and
+# looked up again once they're older than EDITION_CACHE_TTL seconds.
+EDITION_CACHE_PATH = OUTPUT_DIR / ".edition_cache.json"
+EDITION_CACHE_TTL = 24 * 60 * 60
+
+# Downloaded series are also kept here, named by a hash of the edition
+# URL and dimensions. The edition URL ends in the version number, so a
+# new release gets a new name and is downloaded fresh. But we only
+# notice a new release once the edition URL is looked up again: URLs
+# in EDITION_CACHE_PATH are reused for up to 24 hours, and the lookup
+# itself may come from ons_client's on-disk HTTP cache, so a saved copy
+# can be up to about 30 hours behind the latest ONS release. Delete this
+# folder and EDITION_CACHE_PATH to force a fresh download.
+OBS_CACHE_DIR = OUTPUT_DIR / ".obs_cache"
+
 
 # -----------------------------------------------------------------------
 # Helper functions
 # -----------------------------------------------------------------------
 
 def get_json(url, params=None, retries=3):
-    """Make a GET request with retries. Returns parsed JSON or None."""
+    """
+    Make a GET request with retries and return the parsed JSON.
+
+    Raises RuntimeError if every attempt fails. This runs inside worker
+    threads, so it doesn't print anything itself; the caller reports the
+    error alongside the series it belongs to.
+    """
     for attempt in range(retries):
         try:
-            r = requests.get(url, params=params, timeout=30)
+            r = SESSION.get(url, params=params, timeout=30)
             r.raise_for_status()
-            return r.json()
+            return parse_json(r)
         except Exception as e:
             if attempt < retries - 1:
                 time.sleep(2 ** attempt)  # wait 1s, 2s, 4s...
             else:
-                print(f"  FAILED after {retries} attempts: {e}")
-                return None
+                raise RuntimeError(f"failed after {retries} attempts: {e}") from e
+
+
+# Compiled once at import time rather than on every call
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+_SLUG_TRANS = str.maketrans({"%": "pct", "&": "and", "/": "_"})
 
 
 def label_to_filename(label):
     """Convert a human label like 'GDP growth (QoQ)' to 'gdp_growth_qoq'."""
-    s = label.lower()
-    s = s.replace("%", "pct").replace("&", "and").replace("/", "_")
-    s = re.sub(r"[^a-z0-9]+", "_", s)
-    return s.strip("_")
+    s = label.lower().translate(_SLUG_TRANS)
+    return _SLUG_RE.sub("_", s).strip("_")
 
 
 def get_edition_url(dataset_id, preferred_edition="time-series"):
-    """Resolve the latest version URL for a dataset edition."""
+    """
+    Resolve the latest version URL for a dataset edition.
+
+    Returns None if the dataset has no version links. Raises RuntimeError
+    (from get_json) if the dataset itself can't be fetched. If only the
+    editions list fails, falls back to the dataset's latest_version link.
+    """
     data = get_json(ROOT_URL + f"datasets/{dataset_id}")
-    if not data:
-        return None
 
     fallback = data.get("links", {}).get("latest_version", {}).get("href")
 
@@ -59,8 +90,9 @@ def get_edition_url(dataset_id, preferred_edition="time-series"):
     if not editions_url:
         return fallback
 
-    editions = get_json(editions_url)
-    if not editions:
+    try:
+        editions = get_json(editions_url)
+    except RuntimeError:
         return fallback
 
     for item in editions.get("items", []):
@@ -70,47 +102,76 @@ def get_edition_url(dataset_id, preferred_edition="time-series"):
     return fallback
 
 
+def load_edition_cache():
+    """
+    Load edition URLs saved by a previous run.
+
+    Returns a dict mapping (dataset_id, edition) to {"url": ..., "ts": ...},
+    skipping any entries older than EDITION_CACHE_TTL.
+    """
+    try:
+        with open(EDITION_CACHE_PATH) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    # A file of the wrong shape (e.g. edited by hand) is treated as empty
+    if not isinstance(saved, dict):
+        return {}
+
+    now = time.time()
+    cache = {}
+    for key, entry in saved.items():
+        if not isinstance(entry, dict) or not entry.get("url"):
+            continue
+        ts = entry.get("ts")
+        if not isinstance(ts, (int, float)) or now - ts >= EDITION_CACHE_TTL:
+            continue
+        # JSON keys must be strings, so tuples are stored as "dataset::edition"
+        dataset_id, _, edition = key.partition("::")
+        cache[(dataset_id, edition)] = entry
+    return cache
+
+
+def save_edition_cache(cache):
+    """Save resolved edition URLs so the next run can skip looking them up."""
+    saved = {
+        f"{dataset_id}::{edition}": entry
+        for (dataset_id, edition), entry in cache.items()
+        if entry.get("url")
+    }
+    with open(EDITION_CACHE_PATH, "w") as f:
+        json.dump(saved, f, indent=2)
+
+
+def observation_cache_key(edition_url, dimensions):
+    """Fingerprint a query so the same series can be found again next run."""
+    query = json.dumps([edition_url, sorted(dimensions.items())])
+    return hashlib.sha1(query.encode()).hexdigest()
+
+
 def get_observations(edition_url, dimensions):
     """Fetch observations and return a sorted DataFrame."""
     data = get_json(edition_url + "/observations", params=dimensions)
     if not data:
         return pd.DataFrame()
 
-    rows = []
+    periods, period_labels, values = [], [], []
     for obs in data.get("observations", []):
-        time_dim = (
-            obs.get("dimensions", {}).get("Time")
-            or obs.get("dimensions", {}).get("time")
-        )
+        obs_dims = obs.get("dimensions") or {}
+        time_dim = obs_dims.get("Time") or obs_dims.get("time")
         if not time_dim:
             continue
-        rows.append({
-            "period": time_dim.get("id", ""),
-            "period_label": time_dim.get("label", ""),
-            "value": obs.get("observation"),
-        })
+        periods.append(time_dim.get("id", ""))
+        period_labels.append(time_dim.get("label", ""))
+        values.append(obs.get("observation"))
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame({"period": periods, "period_label": period_labels, "value": values})
     if not df.empty:
         df["value"] = pd.to_numeric(df["value"], errors="coerce")
 
         # Sort chronologically
-        def parse_period(s):
-            try:
-                return pd.to_datetime(s, format="%b-%y")
-            except Exception:
-                pass
-            try:
-                return pd.to_datetime(s, format="mixed", dayfirst=False)
-            except Exception:
-                return pd.NaT
-
-        parsed = df["period_label"].apply(parse_period)
-        if parsed.notna().any():
-            df = df.assign(_sort=parsed).sort_values("_sort").drop(columns="_sort")
-        else:
-            df = df.sort_values("period")
-        df = df.reset_index(drop=True)
+        df = sort_by_period(df)
 
     return df
 
@@ -200,56 +261,131 @@ SERIES = [
 # Main download loop
 # -----------------------------------------------------------------------
 
+def download_one(entry, edition_url, edition_error=None):
+    """
+    Download a single series and save it to CSV.
+
+    Returns a (metadata, error) pair: metadata is a dict describing the
+    saved file, or None if the download failed, in which case error
+    holds the reason. edition_error is the reason the edition lookup
+    failed, if it did.
+    """
+    dataset_id, label, overrides, edition = entry
+
+    try:
+        if not edition_url:
+            reason = f": {edition_error}" if edition_error else ""
+            raise ValueError(f"Could not resolve edition for '{dataset_id}'{reason}")
+
+        # Build query: overrides + time wildcard
+        dims = dict(overrides)
+        dims["time"] = "*"
+
+        fname = label_to_filename(label) + ".csv"
+        metadata = {
+            "dataset_id": dataset_id,
+            "filename": fname,
+            "label": label,
+            "edition_url": edition_url,
+        }
+
+        # If we already downloaded this exact query for this version,
+        # reuse the saved copy instead of calling the API again. The key
+        # includes the edition URL, so a matching key means a matching
+        # version (see OBS_CACHE_DIR above for how current that is).
+        key = observation_cache_key(edition_url, dims)
+        cached_csv = OBS_CACHE_DIR / f"{key}.csv"
+        cached_meta = OBS_CACHE_DIR / f"{key}.meta.json"
+        try:
+            with open(cached_meta) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            summary = None
+
+        if isinstance(summary, dict) and cached_csv.exists():
+            shutil.copyfile(cached_csv, OUTPUT_DIR / fname)
+            metadata.update(summary)
+            return metadata, None
+
+        # Download
+        df = get_observations(edition_url, dims)
+        if df.empty:
+            raise ValueError("No observations returned")
+
+        # Save
+        df.to_csv(OUTPUT_DIR / fname, index=False)
+
+        metadata["obs_count"] = len(df)
+        metadata["period_start"] = df["period"].iloc[0]
+        metadata["period_end"] = df["period"].iloc[-1]
+
+        # Keep a copy for next time
+        OBS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(OUTPUT_DIR / fname, cached_csv)
+        with open(cached_meta, "w") as f:
+            json.dump({
+                "obs_count": metadata["obs_count"],
+                "period_start": str(metadata["period_start"]),
+                "period_end": str(metadata["period_end"]),
+            }, f, indent=2)
+
+        return metadata, None
+
+    except Exception as e:
+        return None, str(e)
+
+
 def main():
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
     metadata = []
     errors = []
-    edition_cache = {}
+    edition_cache = load_edition_cache()
 
     print(f"Downloading {len(SERIES)} ONS series...\n")
 
-    for i, (dataset_id, label, overrides, edition) in enumerate(SERIES, 1):
-        print(f"  [{i:2d}/{len(SERIES)}] {label}...", end=" ")
+    # Step 1: Resolve each unique edition URL once, up front. Several
+    # series share a dataset, so this avoids repeating the same lookup
+    # (and avoids the download threads racing to fill the cache). The
+    # lookups are independent, so run them all at the same time too.
+    # URLs remembered from a recent run don't need looking up at all.
+    unique_keys = {(dataset_id, edition or "time-series") for dataset_id, _, _, edition in SERIES}
+    missing_keys = unique_keys - edition_cache.keys()
 
+    def resolve(cache_key):
+        # Keep any error so it can be reported with the series that need it
         try:
-            # Resolve edition URL (cached to avoid repeated lookups)
-            cache_key = (dataset_id, edition or "time-series")
-            if cache_key not in edition_cache:
-                url = get_edition_url(dataset_id, edition or "time-series")
-                if not url:
-                    raise ValueError(f"Could not resolve edition for '{dataset_id}'")
-                edition_cache[cache_key] = url
-
-            edition_url = edition_cache[cache_key]
-
-            # Build query: overrides + time wildcard
-            dims = dict(overrides)
-            dims["time"] = "*"
-
-            # Download
-            df = get_observations(edition_url, dims)
-            if df.empty:
-                raise ValueError("No observations returned")
-
-            # Save
-            fname = label_to_filename(label) + ".csv"
-            df.to_csv(OUTPUT_DIR / fname, index=False)
-            print(f"OK  ({len(df)} observations)")
-
-            metadata.append({
-                "dataset_id": dataset_id,
-                "filename": fname,
-                "label": label,
-                "edition_url": edition_url,
-                "obs_count": len(df),
-                "period_start": df["period"].iloc[0],
-                "period_end": df["period"].iloc[-1],
-            })
-
+            return cache_key, {"url": get_edition_url(*cache_key), "ts": time.time()}
         except Exception as e:
-            errors.append((dataset_id, label, str(e)))
-            print(f"FAILED: {e}")
+            return cache_key, {"url": None, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for cache_key, cache_entry in executor.map(resolve, missing_keys):
+            edition_cache[cache_key] = cache_entry
+    save_edition_cache(edition_cache)
+
+    # Step 2: Download all the series at the same time. Each one is
+    # independent, so the total time is roughly that of the slowest
+    # series rather than the sum of all of them.
+    def download(entry):
+        dataset_id, _, _, edition = entry
+        cache_entry = edition_cache[(dataset_id, edition or "time-series")]
+        return download_one(entry, cache_entry["url"], cache_entry.get("error"))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(download, SERIES)
+
+        # Results come back in the same order as SERIES
+        for i, (entry, (meta, err)) in enumerate(zip(SERIES, results), 1):
+            dataset_id, label, _, _ = entry
+            print(f"  [{i:2d}/{len(SERIES)}] {label}...", end=" ")
+
+            if meta:
+                metadata.append(meta)
+                print(f"OK  ({meta['obs_count']} observations)")
+            else:
+                errors.append((dataset_id, label, err))
+                print(f"FAILED: {err}")
 
     # Save metadata index
     if metadata:
@@ -0,0 +1,129 @@
+"""
+Shared HTTP setup and helpers for the example scripts.
+
+Every example talks to the same host, so they all share a single
+requests.Session from this module. A session keeps connections open
+between calls (HTTP keep-alive), which means we only pay for the
+TCP + TLS handshake once instead of on every request. That adds up
+quickly when paging through the catalogue or fetching many series.
+
+If the optional requests-cache package is installed, the session also
+keeps a cache of responses on disk (under output/.cache/), so re-running
+a script doesn't re-fetch dataset and edition metadata that hasn't
+changed. When a cached entry expires, requests-cache revalidates it
+with the server's ETag, so unchanged data isn't downloaded again.
+Observations are never stored in this HTTP cache. (04_batch_download.py
+does keep its own copies of downloaded series; see OBS_CACHE_DIR there.)
+
+parse_json() reads a response body with the faster orjson library when
+it's installed, and falls back to the standard json module otherwise.
+sort_by_period() puts a DataFrame of observations in date order.
+
+Usage (from another example script):
+    from ons_client import ROOT_URL, SESSION
+
+    response = SESSION.get(ROOT_URL + "datasets")
+"""
+
+import json
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import requests_cache
+except ImportError:  # optional: pip install requests-cache
+    requests_cache = None
+
+ROOT_URL = "https://api.beta.ons.gov.uk/v1/"
+CACHE_DIR = Path(__file__).resolve().parent.parent / "output" / ".cache"
+
+# How long cached metadata (datasets, editions, dimensions) stays valid.
+# ONS metadata changes at most a few times a week.
+CACHE_EXPIRE_AFTER = timedelta(hours=6)
+
+# How many requests the scripts send at the same time. The connection
+# pool below is the same size, so each worker thread keeps reusing one
+# open connection instead of new sockets being opened and thrown away.
+MAX_WORKERS = 8
+
+
+def make_session():
+    """Create a requests.Session that reuses connections to the ONS API."""
+    if requests_cache is not None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        session = requests_cache.CachedSession(
+            str(CACHE_DIR / "ons_cache.sqlite"),
+            expire_after=CACHE_EXPIRE_AFTER,
+            allowable_methods=["GET"],
+            # Once an entry expires, requests-cache revalidates it by default
+            # with If-None-Match / If-Modified-Since. If nothing changed, the
+            # API replies "304 Not Modified" with an empty body and the
+            # cached copy is reused. We deliberately leave cache_control off,
+            # so the server's Cache-Control headers can't override
+            # CACHE_EXPIRE_AFTER (a "no-store" would disable the cache).
+            # Always fetch observations live from the API
+            urls_expire_after={"*/observations*": requests_cache.DO_NOT_CACHE},
+        )
+    else:
+        session = requests.Session()
+
+    # Keep a pool of open connections per host, one per worker thread.
+    # pool_block=True makes any extra thread wait for a free connection
+    # rather than opening a throwaway one. Retries are handled by the
+    # scripts themselves (see get_json in 04_batch_download.py).
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=MAX_WORKERS,
+        pool_block=True,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+
+    session.headers["Connection"] = "keep-alive"
+    session.headers["Accept-Encoding"] = "gzip"
+    return session
+
+
+def parse_json(response):
+    """Parse the JSON body of a response, using orjson if available."""
+    # Both parsers work on the raw bytes. JSON is always UTF-8 (or
+    # UTF-16/32, which json.loads detects itself), so this skips the
+    # charset guessing that response.json() can fall back to.
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+
+def sort_by_period(df):
+    """
+    Sort observations chronologically and return a new DataFrame.
+
+    ONS uses formats like "Nov-25" (Mon-YY), which need careful parsing
+    to avoid 1925 vs 2025 confusion. The whole period_label column is
+    parsed as Mon-YY first, and anything left over gets a second, more
+    flexible pass. If nothing parses, rows are sorted by period id.
+    """
+    labels = df["period_label"]
+    parsed = pd.to_datetime(labels, format="%b-%y", errors="coerce")
+    missing = parsed.isna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(labels[missing], format="mixed", errors="coerce")
+
+    if parsed.notna().any():
+        # NumPy puts unparseable dates (NaT) last
+        df = df.iloc[parsed.to_numpy().argsort(kind="stable")]
+    else:
+        df = df.sort_values("period")
+    return df.reset_index(drop=True)
+
+
+SESSION = make_session()